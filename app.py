@@ -1,120 +1,257 @@
 import streamlit as st
 import pandas as pd
-import json
+import orjson
 from urllib.parse import unquote
 from io import BytesIO
-from PIL import Image, UnidentifiedImageError
-import requests
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from PIL import Image
+import aiohttp
+import pyarrow as pa
 
+DATE_FORMAT = '%d-%m-%Y'
+
+@st.cache_data(ttl=3600, show_spinner=False)
 def load_data(file_path):
-    data = pd.read_csv(file_path)
-    data['Date'] = pd.to_datetime(data['Date'], errors='coerce', dayfirst=True)
+    data = pd.read_csv(
+        file_path,
+        engine='pyarrow',
+        dtype_backend='pyarrow',
+        parse_dates=['Date'],
+        date_format=DATE_FORMAT
+    )
+    # read_csv leaves the whole column as strings if any value is malformed; only then
+    # coerce here so bad values become NaT and the .dt accessors downstream still work
+    if not is_datetime_column(data['Date']):
+        data['Date'] = pd.to_datetime(data['Date'], errors='coerce', format=DATE_FORMAT)
     return data
 
+def is_datetime_column(column):
+    dtype = column.dtype
+    if isinstance(dtype, pd.ArrowDtype):
+        return pa.types.is_timestamp(dtype.pyarrow_dtype)
+    return pd.api.types.is_datetime64_any_dtype(dtype)
+
 def safe_json_loads(json_str):
+    """
+    Parses a row's JSON list of name/value items into a {name: value} dict
+    """
     try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
+        items = {}
+        for item in orjson.loads(json_str):
+            # The first occurrence wins, as the per-item scan it replaces did
+            items.setdefault(item['name'], item['value'])
+        return items
+    except (orjson.JSONDecodeError, TypeError, KeyError):
         return None
 
-def extract_levels(json_data, level_name):
-    if json_data:
-        for item in json_data:
-            if item['name'] == level_name:
-                return item['value']
-    return None
+@st.cache_data(ttl=3600, show_spinner=False)
+def prepare_data(data):
+    data = data.copy()
+    data['json_data'] = data['json data'].apply(safe_json_loads)
+    data = data.dropna(subset=['farmName'])  # Only drop rows with missing farm names
+    data['Severity'] = data['json_data'].str.get('Severity')
+    # Low-cardinality columns are compared and grouped on every rerun
+    data['farmName'] = data['farmName'].astype('category')
+    data['Severity'] = data['Severity'].astype('category')
+    farm_index = data.groupby('farmName', observed=True).indices
+    farms = filter_farms(data)
+    # Keep the first farm in sorted order when names normalise to the same key
+    norm_map = {}
+    for farm in farms:
+        norm_map.setdefault(farm.strip().lower(), farm)
+    idx_map = {farm: i for i, farm in enumerate(farms)}
+    severity_levels = ['Select All'] + sorted(data['Severity'].dropna().unique())
+    return data, farms, severity_levels, farm_index, norm_map, idx_map
 
 def filter_farms(data):
     return sorted(data['farmName'].unique())
 
-def exact_string_match(farm_name_param, farms):
+def exact_string_match(farm_name_param, norm_map):
     """
     Performs exact string matching for farm names
     """
-    farm_name_param = farm_name_param.strip().lower()
-    for farm in farms:
-        if farm.strip().lower() == farm_name_param:
-            return farm
+    return norm_map.get(farm_name_param.strip().lower())
+
+def sniff_image_format(content):
+    if content[:3] == b'\xff\xd8\xff':
+        return 'JPEG'
+    if content[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'PNG'
+    if content[:6] in (b'GIF87a', b'GIF89a'):
+        return 'GIF'
     return None
 
-def download_image(url, filename):
-    try:
-        img_response = requests.get(url)
-        img_response.raise_for_status()
-        
-        img = Image.open(BytesIO(img_response.content))
-        img_format = img.format if img.format else 'JPEG'
-        if img_format not in ['JPEG', 'PNG', 'GIF']:
-            img_format = 'JPEG'
-        
-        buf = BytesIO()
-        img.save(buf, format=img_format)
-        return buf.getvalue(), filename
-    except (requests.exceptions.RequestException, UnidentifiedImageError) as e:
-        st.error(f"Error downloading or processing image: {e}")
-        return None, None
-
-def display_farm_info(data, farm_name):
+def encode_image(content):
+    # Supported formats are served as-is; only re-encode anything else
+    if sniff_image_format(content):
+        return content
+    
+    img = Image.open(BytesIO(content))
+    img_format = img.format if img.format else 'JPEG'
+    if img_format not in ['JPEG', 'PNG', 'GIF']:
+        img_format = 'JPEG'
+    
+    buf = BytesIO()
+    img.save(buf, format=img_format)
+    return buf.getvalue()
+
+class ImageCache:
+    """
+    Bounded, thread-safe url -> image bytes store with a per-entry TTL
+    """
+    def __init__(self, max_entries=512, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            stored_at, img_data = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[url]
+                return None
+            self._entries.move_to_end(url)
+            return img_data
+
+    def set(self, url, img_data):
+        with self._lock:
+            self._entries[url] = (time.monotonic(), img_data)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+@st.cache_resource
+def get_image_cache():
+    # Shared across reruns and sessions; entries are returned by reference, not copied
+    return ImageCache(max_entries=512, ttl=86400)
+
+async def fetch(session, url, retries=3, backoff=0.3):
+    for attempt in range(retries + 1):
+        try:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                content = await response.read()
+            break
+        except aiohttp.ClientResponseError:
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == retries:
+                return None
+            await asyncio.sleep(backoff * 2 ** attempt)
+    return encode_image(content)
+
+async def fetch_all(urls):
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=64),
+        # Per-socket limits like requests' timeout=10; a total cap would also count
+        # time spent waiting for a free connector slot
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=10)
+    ) as session:
+        results = await asyncio.gather(
+            *(fetch(session, url) for url in urls),
+            return_exceptions=True
+        )
+    # Any other per-image failure (e.g. PIL errors while re-encoding) only drops that image
+    return [
+        (url, None if isinstance(result, Exception) else result)
+        for url, result in zip(urls, results)
+    ]
+
+def fetch_images(urls):
+    """
+    Returns {url: bytes} for the successful URLs, downloading only cache misses
+    """
+    cache = get_image_cache()
+    images = {}
+    misses = []
+    for url in urls:
+        img_data = cache.get(url)
+        if img_data is None:
+            misses.append(url)
+        else:
+            images[url] = img_data
+    if misses:
+        for url, img_data in asyncio.run(fetch_all(misses)):
+            # Failures are left uncached so they are retried on the next rerun
+            if img_data is not None:
+                cache.set(url, img_data)
+                images[url] = img_data
+    return images
+
+def display_farm_info(farm_data):
     images_to_download = []
     
-    farm_data = data[data['farmName'] == farm_name]
-    for index, row in farm_data.iterrows():
+    # Each image is fetched once; display, download and zip read it from the cache
+    urls = tuple(dict.fromkeys(url for url in farm_data['Image URL'] if isinstance(url, str)))
+    fetched = fetch_images(urls)
+    date_strs = farm_data['Date'].dt.strftime('%Y-%m-%d').fillna('unknown_date').tolist()
+    columns = ['farmName', 'Image URL', 'json data', 'activity_record', 'Date']
+    rows = farm_data[columns].itertuples(index=True, name=None)
+    for (index, farm_name, image_url, json_data_str, activity, date), date_str in zip(rows, date_strs):
         col1, col2 = st.columns(2)
         with col1:
             # Add error handling for image display
             try:
-                if pd.isna(row['Image URL']) or not isinstance(row['Image URL'], str):
+                if pd.isna(image_url) or not isinstance(image_url, str):
                     st.warning(f"Invalid image URL for entry {index + 1}")
                     continue
                     
-                # Try to fetch the image first to validate it
-                response = requests.get(row['Image URL'])
-                response.raise_for_status()  # This will raise an exception for bad status codes
-                
-                # Try to display the image - removed use_container_width parameter
-                st.image(row['Image URL'], caption=f"Image {index + 1}")
-                
-                # Only proceed with download button if image is valid
-                img_name = (f"{row['farmName']}_{row['Date'].strftime('%Y-%m-%d')}_{index + 1}.jpg" 
-                           if isinstance(row['Date'], pd.Timestamp) 
-                           else f"{row['farmName']}_unknown_date_{index + 1}.jpg")
-                img_data, img_filename = download_image(row['Image URL'], img_name)
-                if img_data:
+                # Image bytes were fetched concurrently above; a failed image
+                # must not skip the row's information column
+                img_data = fetched.get(image_url)
+                if img_data is None:
+                    st.error(f"Error loading image {index + 1}")
+                else:
+                    # Try to display the image - removed use_container_width parameter
+                    st.image(img_data, caption=f"Image {index + 1}")
+                    
+                    img_filename = f"{farm_name}_{date_str}_{index + 1}.jpg"
                     st.download_button(label="Download Image", data=img_data, file_name=img_filename, mime="image/jpeg")
-                    images_to_download.append((img_data, img_filename))
-            except requests.exceptions.RequestException as e:
-                st.error(f"Error loading image {index + 1}: {str(e)}")
+                    images_to_download.append((image_url, img_filename))
             except Exception as e:
                 st.error(f"Unexpected error displaying image {index + 1}: {str(e)}")
             
         with col2:
-            st.write("Farm Name:", row['farmName'])
+            st.write("Farm Name:", farm_name)
             st.write("Other Information:")
             try:
-                if pd.isna(row['json data']):
+                if pd.isna(json_data_str):
                     st.warning("No JSON data available")
                 else:
-                    json_data = json.loads(row['json data'])
+                    json_data = orjson.loads(json_data_str)
                     for item in json_data:
                         st.write(f"{item['name']}: {item['value']}")
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 st.error("Invalid JSON data")
             except Exception as e:
                 st.error(f"Error processing JSON data: {str(e)}")
             
             st.write("#### Activity ")
-            st.write(row['activity_record'] if not pd.isna(row['activity_record']) else "No activity recorded")
+            st.write(activity if not pd.isna(activity) else "No activity recorded")
             st.write('##### Activity Date')
-            st.write(row['Date'] if not pd.isna(row['Date']) else "No date recorded")
+            st.write(date if not pd.isna(date) else "No date recorded")
     
     return images_to_download
 
 def create_zip(images, zip_filename="images.zip"):
-    from zipfile import ZipFile
+    from zipfile import ZipFile, ZIP_STORED
+    # One batched lookup; cache hits are references to the stored bytes, and any
+    # entries evicted since rendering are re-fetched together rather than one by one.
+    # Images are already compressed, so they are stored as-is
+    fetched = fetch_images(tuple(dict.fromkeys(url for url, _ in images)))
     buf = BytesIO()
-    with ZipFile(buf, 'w') as zipf:
-        for img_data, img_filename in images:
-            zipf.writestr(img_filename, img_data)
+    with ZipFile(buf, 'w', compression=ZIP_STORED) as zipf:
+        for url, img_filename in images:
+            img_data = fetched.get(url)
+            if img_data is not None:
+                zipf.writestr(img_filename, img_data)
     buf.seek(0)
     return buf, zip_filename
 
@@ -137,12 +274,7 @@ def main():
         return
     
     # Clean the data
-    data['json_data'] = data['json data'].apply(safe_json_loads)
-    data = data.dropna(subset=['farmName'])  # Only drop rows with missing farm names
-    data['Severity'] = data['json_data'].apply(lambda x: extract_levels(x, 'Severity'))
-
-    farms = filter_farms(data)
-    
+    data, farms, severity_levels, farm_index, norm_map, idx_map = prepare_data(data)
     
     # Updated query parameter handling
     farm_name_param = st.query_params.get('farm_name', None)
@@ -151,9 +283,9 @@ def main():
     # Enhanced farm name matching
     if farm_name_param:
         farm_name_param = unquote(farm_name_param)
-        matched_farm = exact_string_match(farm_name_param, farms)
+        matched_farm = exact_string_match(farm_name_param, norm_map)
         if matched_farm:
-            default_farm_index = farms.index(matched_farm)
+            default_farm_index = idx_map[matched_farm]
             st.success(f"Showing data for farm: {matched_farm}")
         else:
             st.warning(f"Farm '{farm_name_param}' not found. Showing default farm.")
@@ -161,7 +293,6 @@ def main():
     else:
         default_farm_index = 0
 
-    severity_levels = ['Select All'] + sorted(data['Severity'].dropna().unique())
     if severity_param and severity_param in severity_levels:
         default_severity_index = severity_levels.index(severity_param)
     else:
@@ -182,14 +313,14 @@ def main():
     )
 
     if selected_farm:
-        filtered_data = data[data['farmName'] == selected_farm]
+        filtered_data = data.iloc[farm_index[selected_farm]]
         if selected_severity != 'Select All':
             filtered_data = filtered_data[filtered_data['Severity'] == selected_severity]
 
         if filtered_data.empty:
             st.warning("No data available for the selected filters.")
         else:
-            images_to_download = display_farm_info(filtered_data, selected_farm)
+            images_to_download = display_farm_info(filtered_data)
             if images_to_download:
                 zip_data, zip_filename = create_zip(images_to_download)
                 st.sidebar.download_button(